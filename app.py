@@ -65,7 +65,7 @@ def main():
         
         # Display news for each company
         for company in scanner.companies:
-            with st.expander(f"{company} ({scanner.article_counts[company]} articles)", expanded=True):
+            with st.expander(f"{company} ({scanner.article_counts[company]} articles, {scanner.filtered_counts.get(company, 0)} off-target filtered)", expanded=True):
                 # Display word cloud if available
                 if scanner.word_clouds[company]:
                     st.image(
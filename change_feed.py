@@ -0,0 +1,154 @@
+import json
+import queue
+import threading
+import uuid
+from collections import deque
+
+
+def snapshot_scanner(scanner):
+    """Capture the parts of a NewsScanner's state that the change feed tracks.
+
+    Companies whose last search failed are left out, since their state was
+    reset to empty rather than refreshed.
+    """
+    return {
+        company: {
+            'titles': [a['title'] for a in scanner.articles.get(company, [])],
+            'count': scanner.article_counts.get(company, 0),
+            'filtered': scanner.filtered_counts.get(company, 0),
+            'topics': dict(scanner.top_topics.get(company, []))
+        }
+        for company in scanner.companies
+        if company not in scanner.failed_companies
+    }
+
+
+def compute_deltas(previous, current, articles):
+    """Compare two snapshots and return one compact delta per changed company"""
+    deltas = []
+    for company, state in current.items():
+        old = previous.get(company, {'titles': [], 'count': 0, 'filtered': 0, 'topics': {}})
+        delta = {'company': company}
+
+        # New articles, keyed by title like the scanner's own dedup
+        seen_titles = set(old['titles'])
+        new_articles = [
+            {
+                'title': a['title'],
+                'link': a.get('link'),
+                'date': a.get('date')
+            }
+            for a in articles.get(company, [])
+            if a['title'] not in seen_titles
+        ]
+        if new_articles:
+            delta['new_articles'] = new_articles
+
+        if state['count'] != old['count']:
+            delta['count'] = state['count']
+        if state['filtered'] != old['filtered']:
+            delta['filtered'] = state['filtered']
+
+        # Topic scores that changed, with None marking a topic that dropped out
+        changed_topics = {
+            topic: score for topic, score in state['topics'].items()
+            if old['topics'].get(topic) != score
+        }
+        for topic in old['topics']:
+            if topic not in state['topics']:
+                changed_topics[topic] = None
+        if changed_topics:
+            delta['topics'] = changed_topics
+
+        if len(delta) > 1:
+            deltas.append(delta)
+    return deltas
+
+
+class ChangeFeed:
+    """Bounded fan-out broadcaster for server-sent events.
+
+    Every subscriber gets its own bounded queue. A subscriber whose queue is
+    full is dropped instead of blocking the publisher; it can reconnect with
+    its Last-Event-ID and replay what it missed from the history buffer.
+
+    Event IDs have the form "<boot_id>-<n>", where boot_id is unique to this
+    feed instance. When replay is not possible (the events were evicted, or
+    the ID belongs to another boot of the server) the subscriber gets a single
+    reset event instead, telling it to reload the full page.
+    """
+
+    def __init__(self, history_size=500, queue_size=100, boot_id=None):
+        self.history = deque(maxlen=history_size)
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.boot_id = boot_id or uuid.uuid4().hex[:8]
+        self.next_id = 1
+        self.lock = threading.Lock()
+
+    def event_id(self, n):
+        return f"{self.boot_id}-{n}"
+
+    def _parse_event_id(self, last_event_id):
+        """Return the sequence number of an ID from this boot, or None"""
+        boot_id, _, n = str(last_event_id).rpartition('-')
+        if boot_id != self.boot_id or not n.isdigit():
+            return None
+        return int(n)
+
+    def publish(self, event, data):
+        """Record an event, fan it out to every live subscriber and return its ID"""
+        with self.lock:
+            message = (self.next_id, event, json.dumps(data, ensure_ascii=False))
+            self.next_id += 1
+            self.history.append(message)
+            for subscriber in list(self.subscribers):
+                if subscriber.qsize() >= self.queue_size:
+                    # Slow client: drop it so it cannot hold up the refresher.
+                    # The extra slot always leaves room for the close marker.
+                    self.subscribers.discard(subscriber)
+                    subscriber.put_nowait(None)
+                else:
+                    subscriber.put_nowait(message)
+        return self.event_id(message[0])
+
+    def subscribe(self, last_event_id=None):
+        """Register a subscriber, returning its queue and any events to replay"""
+        subscriber = queue.Queue(maxsize=self.queue_size + 1)
+        with self.lock:
+            last_n = None if last_event_id is None else self._parse_event_id(last_event_id)
+            if last_event_id is None:
+                backlog = []
+            elif last_n is None or last_n >= self.next_id or (
+                    self.history and last_n + 1 < self.history[0][0]):
+                backlog = [(self.next_id - 1, 'reset', json.dumps({'reason': 'history unavailable'}))]
+            else:
+                backlog = [m for m in self.history if m[0] > last_n]
+            self.subscribers.add(subscriber)
+        return subscriber, backlog
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def stream(self, last_event_id=None, keepalive=15):
+        """Yield formatted SSE messages for one client until it falls behind"""
+        subscriber, backlog = self.subscribe(last_event_id)
+        try:
+            for message in backlog:
+                yield self.format(message)
+            while True:
+                try:
+                    message = subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if message is None:
+                    return
+                yield self.format(message)
+        finally:
+            self.unsubscribe(subscriber)
+
+    def format(self, message):
+        n, event, data = message
+        return f"id: {self.event_id(n)}\nevent: {event}\ndata: {data}\n\n"
@@ -1,7 +1,15 @@
-from flask import Flask, request, jsonify, send_file
+import matplotlib
+# Render charts off-screen: the refresher draws word clouds and the Venn
+# diagram on a background thread, where GUI backends fail
+matplotlib.use('Agg')
+
+from flask import Flask, request, jsonify, send_file, Response
 from flask_cors import CORS
 from simple_search import NewsScanner
+from change_feed import ChangeFeed, snapshot_scanner, compute_deltas
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 app = Flask(__name__)
@@ -11,10 +19,38 @@ CORS(app)
 scanner = NewsScanner()
 scanner.run()
 
+# Change feed pushed to /events clients as refreshes find new coverage
+feed = ChangeFeed()
+REFRESH_INTERVAL = int(os.getenv('REFRESH_INTERVAL', '900'))  # seconds
+
+def refresh_loop():
+    """Periodically re-run the scanner and publish what changed"""
+    previous = snapshot_scanner(scanner)
+    while True:
+        time.sleep(REFRESH_INTERVAL)
+        try:
+            scanner.refresh()
+            # Companies whose fetch failed are left out of the snapshot, so
+            # they publish nothing and keep their last good state
+            current = snapshot_scanner(scanner)
+            for delta in compute_deltas(previous, current, scanner.articles):
+                feed.publish('update', delta)
+            previous = {**previous, **current}
+        except Exception as e:
+            print(f"Error refreshing news: {str(e)}")
+
 @app.route('/')
 def home():
     return send_file('news_analysis.html')
 
+@app.route('/events')
+def events():
+    # Browsers send Last-Event-ID on reconnect; allow a query param as fallback.
+    # IDs from another server boot or in an unknown format get a reset event.
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    return Response(feed.stream(last_event_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/ask', methods=['POST'])
 def ask_question():
     try:
@@ -39,5 +75,9 @@ def ask_question():
 
 if __name__ == '__main__':
     load_dotenv()
+    # Start the refresher here rather than at import, and keep the debug
+    # reloader off: it imports the module in a second process, which would
+    # run a second refresher publishing to a feed no client can reach
+    threading.Thread(target=refresh_loop, daemon=True).start()
     print("Server starting at http://localhost:5000")
-    app.run(debug=True, port=5000) 
\ No newline at end of file
+    app.run(debug=True, port=5000, use_reloader=False) 
\ No newline at end of file
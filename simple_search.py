@@ -12,11 +12,13 @@ import io
 import base64
 from GoogleNews import GoogleNews
 from textblob import TextBlob
-from collections import Counter
+from collections import Counter, deque
 import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 import json
+import tempfile
+import re
 from dotenv import load_dotenv
 import aiohttp
 import asyncio
@@ -33,9 +35,79 @@ class NewsScanner:
             "Alleanza Assicurazioni"
         ]
         self.article_counts = {}
+        self.filtered_counts = {}  # Off-target articles dropped by the relevance filter
+        self.failed_companies = set()  # Companies whose last search raised an error
         self.word_clouds = {}
         self.top_topics = {}
         self.articles = {}  # Store articles for search functionality
+        
+        # Limits that keep a search in bounded memory however many results it returns
+        self.max_pages = 1  # Google News result pages fetched per search, one at a time
+        self.max_articles = 100  # Articles kept per company for rendering
+        self.dedup_window = 5000  # Recent titles (and relevance verdicts) remembered per search
+        
+        # Detailed topic categories with related terms
+        self.topic_categories = {
+            'Environmental': ['sostenibilità', 'ambiente', 'green', 'climate', 'energia', 'rinnovabile', 'emissioni', 'riciclo'],
+            'Digital Innovation': ['innovazione', 'digitale', 'tecnologia', 'digital', 'startup', 'intelligenza', 'app', 'online'],
+            'Investment': ['finanza', 'investimenti', 'risparmio', 'mercato', 'economia', 'finanziario', 'borsa', 'trading'],
+            'Health Services': ['salute', 'sanitario', 'benessere', 'prevenzione', 'medico', 'assistenza', 'clinica', 'terapia'],
+            'Community Support': ['sociale', 'comunità', 'welfare', 'solidarietà', 'inclusione', 'diversity', 'volontariato', 'donazioni'],
+            'Business Growth': ['business', 'strategia', 'partnership', 'crescita', 'sviluppo', 'mercato', 'espansione', 'acquisizione'],
+            'Customer Service': ['clienti', 'servizio', 'assistenza', 'supporto', 'soddisfazione', 'qualità', 'esperienza', 'consulenza'],
+            'Product Innovation': ['prodotti', 'soluzioni', 'novità', 'lancio', 'offerta', 'polizza', 'copertura', 'protezione'],
+            'Market Position': ['leadership', 'competitività', 'posizione', 'quota', 'presenza', 'network', 'distribuzione', 'canali'],
+            'Risk Management': ['rischio', 'sicurezza', 'protezione', 'gestione', 'controllo', 'compliance', 'normativa', 'regolamento']
+        }
+        
+        # Per-company alias patterns with their weights, and exclusion patterns that
+        # mark generic uses of the name. Patterns are case-insensitive unless they
+        # opt out with (?-i:...). A weak alias also needs an insurance term from
+        # relevance_context or the company's own 'context' patterns. An article is
+        # kept when its score reaches relevance_threshold.
+        self.relevance_rules = {
+            "VitaNuova Assicurazioni": {
+                'aliases': {
+                    r'\bvita\s*nuova\s+assicurazion[ei]\b': 2,
+                    r'\bvitanuova\b': 2,
+                    r'\bvita\s+nuova\b': 1
+                },
+                'exclusions': [
+                    r'\bdante\b', r'\balighieri\b', r'\bromanzo\b', r'\blibro\b', r'\bfilm\b',
+                    r'\bcanzone\b', r'\balbum\b', r'\bchiesa\b', r'\bparrocchia\b'
+                ]
+            },
+            "Unidea Assicurazioni": {
+                'aliases': {
+                    r'\bunidea\b': 2
+                },
+                'exclusions': []
+            },
+            "Alleanza Assicurazioni": {
+                'aliases': {
+                    r'\balleanza\s+assicurazion[ei]\b': 2,
+                    r'\balleanza\b': 1
+                },
+                'exclusions': [
+                    r'\balleanza\s+(?:verdi|atlantica|nazionale|progressista|cooperative)\b',
+                    r'(?-i:\bNATO\b)',
+                    r'\bpartit[oi]\s+(?:democratico|politic[oi]|comunista|socialista|popolare|di\s+maggioranza|di\s+opposizione)\b',
+                    r'\belezioni\b', r'\bcoalizione\b'
+                ],
+                # Alleanza sells through its own agent network; bare "agenti"
+                # is too generic (agenti immobiliari, agenti di polizia)
+                'context': [
+                    r'\b(?:rete|piano)\s+(?:di\s+|degli\s+)?agent[ei]\b',
+                    r'\bagent[ei]\s+(?:di\s+)?alleanza\b'
+                ]
+            }
+        }
+        # Insurance vocabulary that confirms a weak alias match
+        self.relevance_context = r'\b(?:assicura\w*|polizz[ae]|ivass|previdenz\w*)\b'
+        self.relevance_threshold = 2
+        
+        self.relevance_patterns = self._compile_relevance_rules()
+        self._relevance_cache = {}  # Verdicts per company, keyed by article link or title
         self.heygen_api_key = os.getenv('HEYGEN_API_KEY')
         self.heygen_avatar_id = os.getenv('HEYGEN_AVATAR_ID')
         
@@ -59,97 +131,173 @@ class NewsScanner:
             'company', 'companies', 'group', 'gruppo', 'società'
         ])
 
-    def clean_text_for_wordcloud(self, text, company):
-        # Simple tokenization using split
-        words = text.lower().split()
-        # Remove company name words, stop words, and short words
+    def _compile_relevance_rules(self):
+        """Compile the relevance rules once so each article costs a few regex scans"""
+        return {
+            company: {
+                'aliases': [(re.compile(p, re.IGNORECASE), w) for p, w in rules['aliases'].items()],
+                'exclusions': [re.compile(p, re.IGNORECASE) for p in rules['exclusions']],
+                'context': re.compile('|'.join([self.relevance_context] + rules.get('context', [])),
+                                      re.IGNORECASE)
+            }
+            for company, rules in self.relevance_rules.items()
+        }
+
+    def relevance_score(self, article, company):
+        """Score how clearly an article is about the company rather than a generic phrase"""
+        patterns = self.relevance_patterns.get(company)
+        if patterns is None:
+            return self.relevance_threshold  # No rules: keep everything
+        text = f"{article.get('title', '')} {article.get('desc', '')}"
+        score = sum(weight for pattern, weight in patterns['aliases'] if pattern.search(text))
+        if score == 0:
+            return 0
+        if patterns['context'].search(text):
+            score += 1
+        score -= 2 * sum(1 for pattern in patterns['exclusions'] if pattern.search(text))
+        return score
+
+    def _filter_relevant(self, articles, company):
+        """Yield on-target articles, counting the dropped ones in filtered_counts"""
+        # Reuse verdicts from the previous fetch; keep at most dedup_window of
+        # this fetch's so the cache stays bounded
+        previous = self._relevance_cache.get(company, {})
+        verdicts = {}
+        self.filtered_counts[company] = 0
+        for article in articles:
+            key = article.get('link') or article['title']
+            relevant = previous.get(key)
+            if relevant is None:
+                relevant = self.relevance_score(article, company) >= self.relevance_threshold
+            if len(verdicts) < self.dedup_window:
+                verdicts[key] = relevant
+            if relevant:
+                yield article
+            else:
+                self.filtered_counts[company] += 1
+        self._relevance_cache[company] = verdicts
+
+    def _company_words(self, company):
+        """Words of the company name to keep out of the word cloud"""
         company_words = set(company.lower().split())
         # For VitaNuova, also add individual parts
         if "vitanuova" in company.lower():
             company_words.update(["vita", "nuova"])
-        
-        filtered_words = [
-            word.strip('.,!?()[]{}":;') for word in words 
-            if len(word) >= 4 and  # Only words with 4+ letters
-            word.strip('.,!?()[]{}":;').isalpha() and  # Only alphabetic words
-            word not in company_words and  # Remove company name words
-            word not in self.stop_words  # Remove stop words
-        ]
-        
-        # Count word frequencies and get top 20
-        word_freq = Counter(filtered_words)
-        top_words = [word for word, _ in word_freq.most_common(20)]
-        return " ".join(top_words)
+        return company_words
 
-    def extract_topics(self, texts):
-        """Extract main topics from a list of texts using semantic analysis"""
-        # Combine all texts
-        combined_text = " ".join(texts)
-        
-        # Define detailed topic categories with related terms
-        topic_categories = {
-            'Environmental': ['sostenibilità', 'ambiente', 'green', 'climate', 'energia', 'rinnovabile', 'emissioni', 'riciclo'],
-            'Digital Innovation': ['innovazione', 'digitale', 'tecnologia', 'digital', 'startup', 'intelligenza', 'app', 'online'],
-            'Investment': ['finanza', 'investimenti', 'risparmio', 'mercato', 'economia', 'finanziario', 'borsa', 'trading'],
-            'Health Services': ['salute', 'sanitario', 'benessere', 'prevenzione', 'medico', 'assistenza', 'clinica', 'terapia'],
-            'Community Support': ['sociale', 'comunità', 'welfare', 'solidarietà', 'inclusione', 'diversity', 'volontariato', 'donazioni'],
-            'Business Growth': ['business', 'strategia', 'partnership', 'crescita', 'sviluppo', 'mercato', 'espansione', 'acquisizione'],
-            'Customer Service': ['clienti', 'servizio', 'assistenza', 'supporto', 'soddisfazione', 'qualità', 'esperienza', 'consulenza'],
-            'Product Innovation': ['prodotti', 'soluzioni', 'novità', 'lancio', 'offerta', 'polizza', 'copertura', 'protezione'],
-            'Market Position': ['leadership', 'competitività', 'posizione', 'quota', 'presenza', 'network', 'distribuzione', 'canali'],
-            'Risk Management': ['rischio', 'sicurezza', 'protezione', 'gestione', 'controllo', 'compliance', 'normativa', 'regolamento']
-        }
-        
-        # Count occurrences of topic-related terms
-        topic_scores = Counter()
-        words = combined_text.lower().split()
-        
+    def _wordcloud_words(self, words, company_words):
+        """Yield the word cloud candidates from a stream of lowercased words"""
+        for word in words:
+            stripped = word.strip('.,!?()[]{}":;')
+            if (len(word) >= 4 and  # Only words with 4+ letters
+                    stripped.isalpha() and  # Only alphabetic words
+                    word not in company_words and  # Remove company name words
+                    word not in self.stop_words):  # Remove stop words
+                yield stripped
+
+    def _score_topics(self, words, topic_scores):
+        """Add the topic matches of a stream of lowercased words to topic_scores"""
         for word in words:
-            for topic, terms in topic_categories.items():
+            for topic, terms in self.topic_categories.items():
                 if any(term in word for term in terms):
                     topic_scores[topic] += 1
-        
+        return topic_scores
+
+    @staticmethod
+    def _top_topics(topic_scores):
         # Get top 3 topics with their scores
-        top_topics = topic_scores.most_common(3)
-        return [(topic, score) for topic, score in top_topics if score > 0]
+        return [(topic, score) for topic, score in topic_scores.most_common(3) if score > 0]
+
+    @staticmethod
+    def _top_words(word_freq):
+        # Get top 20 words by frequency
+        return " ".join(word for word, _ in word_freq.most_common(20))
+
+    def _fetch_results(self, query):
+        """Yield raw Google News results for a query, one page at a time"""
+        self.gnews.clear()
+        self.gnews.search(query)
+        page = 1
+        while True:
+            results = self.gnews.results()
+            if not results:
+                break
+            yield from results
+            # Release the library's buffered page before fetching the next one
+            self.gnews.clear()
+            page += 1
+            if page > self.max_pages:
+                break
+            self.gnews.get_page(page)
+        self.gnews.clear()
+
+    def _dedup(self, results):
+        """Yield results with a title, skipping titles seen in the last dedup_window"""
+        seen_titles = set()
+        recent_titles = deque()
+        for result in results:
+            title = result.get('title')
+            if title and title not in seen_titles:
+                seen_titles.add(title)
+                recent_titles.append(title)
+                if len(recent_titles) > self.dedup_window:
+                    seen_titles.discard(recent_titles.popleft())
+                yield result
+
+    @staticmethod
+    def _tokenize(articles):
+        """Yield (article, lowercased words of its title and description) pairs"""
+        for article in articles:
+            yield article, f"{article['title']} {article.get('desc', '')}".lower().split()
+
+    def analyze_stream(self, results, company):
+        """Fold a stream of raw results for a company into running totals.
+
+        Memory stays bounded however long the stream is: only the first
+        max_articles articles are kept for rendering, dedup and relevance
+        verdicts remember at most dedup_window entries, and topic scores and
+        word frequencies are running Counters bounded by the vocabulary.
+
+        Returns (kept articles, article count, topic Counter, word Counter).
+        """
+        kept_articles = []
+        count = 0
+        topic_scores = Counter()
+        word_freq = Counter()
+        company_words = self._company_words(company)
+        articles = self._filter_relevant(self._dedup(results), company)
+        for article, words in self._tokenize(articles):
+            count += 1
+            if len(kept_articles) < self.max_articles:
+                kept_articles.append(article)
+            self._score_topics(words, topic_scores)
+            word_freq.update(self._wordcloud_words(words, company_words))
+        return kept_articles, count, topic_scores, word_freq
 
     def search_company_news(self, company):
         print(f"\nSearching news for {company}...")
         try:
-            self.gnews.clear()
             print("  Making request to Google News...")
-            self.gnews.search(company)
             print("  Fetching results...")
-            results = self.gnews.results()
-            
-            # Verify results and filter out duplicates
-            verified_results = []
-            seen_titles = set()
-            for result in results:
-                if result.get('title') and result['title'] not in seen_titles:
-                    verified_results.append(result)
-                    seen_titles.add(result['title'])
+            verified_results, actual_count, topic_scores, word_freq = self.analyze_stream(
+                self._fetch_results(company), company)
             
-            actual_count = len(verified_results)
             print(f"  Found {actual_count} unique articles")
+            print(f"  Filtered out {self.filtered_counts[company]} off-target articles")
             
             # Store article count and results
             self.article_counts[company] = actual_count
+            self.failed_companies.discard(company)
             self.articles[company] = verified_results
             
-            # Extract texts for topic analysis
-            texts = [f"{r['title']} {r.get('desc', '')}" for r in verified_results]
-            
             print("  Analyzing topics...")
             # Get top topics
-            self.top_topics[company] = self.extract_topics(texts)
+            self.top_topics[company] = self._top_topics(topic_scores)
             
             # Generate word cloud from titles and descriptions
-            text = " ".join(texts)
-            if text.strip():
+            if actual_count:
                 print("  Generating word cloud...")
-                # Clean and filter text
-                cleaned_text = self.clean_text_for_wordcloud(text, company)
+                cleaned_text = self._top_words(word_freq)
                 if cleaned_text.strip():
                     wordcloud = WordCloud(width=400, height=200, 
                                        background_color='white',
@@ -175,7 +323,9 @@ class NewsScanner:
                 self.word_clouds[company] = None
         except Exception as e:
             print(f"  Error processing {company}: {str(e)}")
+            self.failed_companies.add(company)
             self.article_counts[company] = 0
+            self.filtered_counts[company] = 0
             self.articles[company] = []
             self.top_topics[company] = []
             self.word_clouds[company] = None
@@ -185,19 +335,8 @@ class NewsScanner:
         try:
             query = f'"{company1}" AND "{company2}"'
             print(f"\nSearching for articles mentioning both {company1} and {company2}...")
-            self.gnews.clear()
-            self.gnews.search(query)
-            results = self.gnews.results()
-            
-            # Verify results and filter out duplicates
-            verified_results = []
-            seen_titles = set()
-            for result in results:
-                if result.get('title') and result['title'] not in seen_titles:
-                    verified_results.append(result)
-                    seen_titles.add(result['title'])
-            
-            count = len(verified_results)
+            # Count unique results without keeping them
+            count = sum(1 for _ in self._dedup(self._fetch_results(query)))
             print(f"  Found {count} unique articles")
             return count
         except Exception as e:
@@ -293,7 +432,7 @@ class NewsScanner:
         except Exception as e:
             return f"Error: {str(e)}"
 
-    def generate_html(self):
+    def generate_html(self, open_browser=True):
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         venn_diagram, overlaps = self.generate_venn_diagram()
         
@@ -420,11 +559,22 @@ class NewsScanner:
         '''
         
         # Write HTML to file and open in browser
-        with open('news_analysis.html', 'w', encoding='utf-8') as f:
-            f.write(html)
+        # Write to a temporary file and swap it in, so the server never sends
+        # a half-written report while a refresh is rewriting it
+        report_path = os.path.realpath('news_analysis.html')
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(report_path), suffix='.html.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(html)
+            os.chmod(tmp_path, 0o644)  # mkstemp creates the file owner-only
+            os.replace(tmp_path, report_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
         
-        print("Done! Opening report in your browser.")
-        webbrowser.open('file://' + os.path.realpath('news_analysis.html'))
+        if open_browser:
+            print("Done! Opening report in your browser.")
+            webbrowser.open('file://' + report_path)
 
     def _generate_news_content(self):
         """Generate HTML content for news tab"""
@@ -433,7 +583,7 @@ class NewsScanner:
             section = f'''
             <div class="company-section">
                 <h2>{company}</h2>
-                <p>Found {self.article_counts[company]} articles</p>
+                <p>Found {self.article_counts[company]} articles ({self.filtered_counts.get(company, 0)} off-target filtered out)</p>
                 '''
             
             # Add word cloud if available
@@ -534,6 +684,13 @@ class NewsScanner:
         content.append('</div>')
         return '\n'.join(content)
 
+    def refresh(self):
+        """Re-run the search for every company and rewrite the report without opening a browser"""
+        for company in self.companies:
+            self.search_company_news(company)
+        self.generate_html(open_browser=False)
+        return self
+
     def run(self):
         print("\nStarting news analysis...")
         print("Period: Last 12 months")
@@ -0,0 +1,158 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from change_feed import ChangeFeed, compute_deltas, snapshot_scanner
+
+
+def make_scanner(articles, topics, failed=()):
+    return SimpleNamespace(
+        companies=list(articles),
+        articles=articles,
+        article_counts={c: len(a) for c, a in articles.items()},
+        filtered_counts={c: 0 for c in articles},
+        top_topics=topics,
+        failed_companies=set(failed)
+    )
+
+
+def drain(subscriber):
+    messages = []
+    while not subscriber.empty():
+        messages.append(subscriber.get_nowait())
+    return messages
+
+
+def test_compute_deltas_reports_new_articles_counts_and_topics():
+    before = make_scanner({'A': [{'title': 'old', 'link': 'l1'}]},
+                          {'A': [('Investment', 2), ('Environmental', 1)]})
+    after = make_scanner({'A': [{'title': 'old', 'link': 'l1'}, {'title': 'new', 'link': 'l2'}]},
+                         {'A': [('Investment', 3)]})
+
+    deltas = compute_deltas(snapshot_scanner(before), snapshot_scanner(after), after.articles)
+
+    assert deltas == [{
+        'company': 'A',
+        'new_articles': [{'title': 'new', 'link': 'l2', 'date': None}],
+        'count': 2,
+        'topics': {'Investment': 3, 'Environmental': None}
+    }]
+
+
+def test_compute_deltas_skips_unchanged_companies():
+    scanner = make_scanner({'A': [{'title': 't'}]}, {'A': [('Investment', 1)]})
+    snapshot = snapshot_scanner(scanner)
+    assert compute_deltas(snapshot, snapshot, scanner.articles) == []
+
+
+def test_failed_company_is_left_out_of_snapshot():
+    good = make_scanner({'A': [{'title': 't'}], 'B': [{'title': 'u'}]},
+                        {'A': [('Investment', 1)], 'B': [('Investment', 1)]})
+    failed = make_scanner({'A': [], 'B': [{'title': 'u'}]},
+                          {'A': [], 'B': [('Investment', 1)]}, failed={'A'})
+
+    previous = snapshot_scanner(good)
+    current = snapshot_scanner(failed)
+
+    assert 'A' not in current
+    assert compute_deltas(previous, current, failed.articles) == []
+    # The last good state is kept, so recovery does not republish everything
+    assert compute_deltas({**previous, **current}, snapshot_scanner(good), good.articles) == []
+
+
+def test_publish_fans_out_to_all_subscribers():
+    feed = ChangeFeed(boot_id='boot')
+    first, _ = feed.subscribe()
+    second, _ = feed.subscribe()
+
+    assert feed.publish('update', {'company': 'A'}) == 'boot-1'
+
+    expected = [(1, 'update', json.dumps({'company': 'A'}))]
+    assert drain(first) == expected
+    assert drain(second) == expected
+
+
+def test_slow_subscriber_is_dropped_without_blocking():
+    feed = ChangeFeed(queue_size=2)
+    slow, _ = feed.subscribe()
+    fast, _ = feed.subscribe()
+
+    for i in range(2):
+        feed.publish('update', {'i': i})
+        drain(fast)
+    feed.publish('update', {'i': 2})
+
+    assert slow not in feed.subscribers
+    assert fast in feed.subscribers
+    assert [m and m[0] for m in drain(slow)] == [1, 2, None]
+    assert [m[0] for m in drain(fast)] == [3]
+
+
+def test_reconnect_replays_events_after_last_event_id():
+    feed = ChangeFeed(boot_id='boot')
+    for i in range(5):
+        feed.publish('update', {'i': i})
+
+    _, backlog = feed.subscribe(last_event_id='boot-3')
+
+    assert [m[0] for m in backlog] == [4, 5]
+
+
+def test_reconnect_without_last_event_id_gets_no_backlog():
+    feed = ChangeFeed()
+    feed.publish('update', {})
+    _, backlog = feed.subscribe()
+    assert backlog == []
+
+
+def test_reconnect_after_history_eviction_gets_reset():
+    feed = ChangeFeed(history_size=3, boot_id='boot')
+    for i in range(6):
+        feed.publish('update', {'i': i})
+
+    _, backlog = feed.subscribe(last_event_id='boot-1')
+
+    assert [(m[0], m[1]) for m in backlog] == [(6, 'reset')]
+    # The oldest event still in history can be resumed from normally
+    _, backlog = feed.subscribe(last_event_id='boot-3')
+    assert [m[0] for m in backlog] == [4, 5, 6]
+
+
+@pytest.mark.parametrize('published', [1, 7])
+def test_reconnect_after_server_restart_gets_reset(published):
+    old_feed = ChangeFeed(boot_id='old')
+    for i in range(5):
+        last_event_id = old_feed.publish('update', {'i': i})
+
+    # The restarted server may already have published past the client's ID
+    new_feed = ChangeFeed(boot_id='new')
+    for i in range(published):
+        new_feed.publish('update', {'i': i})
+
+    _, backlog = new_feed.subscribe(last_event_id=last_event_id)
+
+    assert [m[1] for m in backlog] == ['reset']
+
+
+@pytest.mark.parametrize('last_event_id', ['3', 'boot-', 'boot-x', 'boot-99'])
+def test_malformed_or_unknown_last_event_id_gets_reset(last_event_id):
+    feed = ChangeFeed(boot_id='boot')
+    for i in range(5):
+        feed.publish('update', {'i': i})
+
+    _, backlog = feed.subscribe(last_event_id=last_event_id)
+
+    assert [m[1] for m in backlog] == ['reset']
+
+
+def test_stream_formats_backlog_as_sse():
+    feed = ChangeFeed(boot_id='boot')
+    feed.publish('update', {'company': 'A'})
+    feed.publish('update', {'company': 'B'})
+
+    stream = feed.stream(last_event_id='boot-1')
+
+    assert next(stream) == 'id: boot-2\nevent: update\ndata: {"company": "B"}\n\n'
+    stream.close()
+    assert feed.subscribers == set()
@@ -0,0 +1,170 @@
+import tracemalloc
+from types import SimpleNamespace
+
+import pytest
+
+# Needs the packages in requirements.txt; the module is skipped without them
+simple_search = pytest.importorskip(
+    "simple_search", reason="requirements.txt is not installed")
+
+
+class FakeGoogleNews:
+    """Stand-in for GoogleNews that builds each result page on demand"""
+
+    def __init__(self, *args, **kwargs):
+        self.page_results = []
+        self.requested_pages = []
+        self.make_page = lambda key, page: []
+
+    def search(self, key):
+        self.key = key
+        self.get_page(1)
+
+    def get_page(self, page=1):
+        self.requested_pages.append(page)
+        self.page_results.extend(self.make_page(self.key, page))
+
+    def results(self):
+        return self.page_results
+
+    def clear(self):
+        self.page_results = []
+
+
+@pytest.fixture
+def scanner(monkeypatch):
+    monkeypatch.setattr(simple_search, 'GoogleNews', FakeGoogleNews)
+    monkeypatch.setattr(simple_search.nltk.data, 'find', lambda *args: None)
+    monkeypatch.setattr(simple_search, 'stopwords', SimpleNamespace(words=lambda lang: ['della', 'per']))
+    return simple_search.NewsScanner()
+
+
+def synthetic_pages(total, page_size=100):
+    """Build a page maker serving `total` unique on-target results"""
+    def make_page(key, page):
+        start = (page - 1) * page_size
+        return [
+            {
+                'title': f"Unidea Assicurazioni notizia {i}",
+                'desc': "nuova polizza salute per il mercato",
+                'link': f"https://example.com/{i}"
+            }
+            for i in range(start, min(start + page_size, total))
+        ]
+    return make_page
+
+
+def test_fetch_results_streams_pages_up_to_max_pages(scanner):
+    scanner.gnews.make_page = synthetic_pages(total=1000)
+    scanner.max_pages = 3
+
+    results = list(scanner._fetch_results('Unidea Assicurazioni'))
+
+    assert len(results) == 300
+    assert scanner.gnews.requested_pages == [1, 2, 3]
+    assert scanner.gnews.results() == []
+
+
+def test_analyze_stream_dedups_and_folds_counters(scanner):
+    results = [
+        {'title': 'Unidea lancia una polizza salute', 'desc': 'Mercato in crescita'},
+        {'title': 'Unidea lancia una polizza salute', 'desc': 'Duplicato'},
+        {'title': '', 'desc': 'Senza titolo'},
+        {'title': 'Unidea premia la rete', 'desc': 'Servizio clienti'}
+    ]
+
+    kept, count, topic_scores, word_freq = scanner.analyze_stream(iter(results), 'Unidea Assicurazioni')
+
+    assert count == 2
+    assert [a['desc'] for a in kept] == ['Mercato in crescita', 'Servizio clienti']
+    assert topic_scores['Product Innovation'] == 1
+    assert topic_scores['Customer Service'] == 2
+    assert word_freq['polizza'] == 1
+    assert 'unidea' not in word_freq
+
+
+def test_dedup_forgets_titles_outside_window(scanner):
+    scanner.dedup_window = 2
+    results = [{'title': t} for t in ['a', 'b', 'a', 'c', 'd', 'a']]
+
+    assert [r['title'] for r in scanner._dedup(iter(results))] == ['a', 'b', 'c', 'd', 'a']
+
+
+def test_analyze_stream_memory_stays_flat(scanner):
+    total = 4000
+    scanner.gnews.make_page = synthetic_pages(total)
+    scanner.max_pages = total // 100
+    scanner.max_articles = 50
+    scanner.dedup_window = 200
+    company = 'Unidea Assicurazioni'
+    first_half_peak = []
+
+    def measured(results):
+        for i, result in enumerate(results, 1):
+            yield result
+            if i == total // 2:
+                first_half_peak.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.reset_peak()
+
+    tracemalloc.start()
+    try:
+        kept, count, _, _ = scanner.analyze_stream(measured(scanner._fetch_results(company)), company)
+        second_half_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert count == total
+    assert len(kept) == 50
+    # Doubling the articles processed must not grow peak memory
+    assert second_half_peak <= first_half_peak[0] * 1.1 + 64 * 1024
+    assert second_half_peak < 2 * 1024 * 1024
+
+
+@pytest.mark.parametrize('company, title, relevant', [
+    ("VitaNuova Assicurazioni", "Vita Nuova Assicurazioni lancia una nuova polizza vita", True),
+    ("VitaNuova Assicurazioni", "VitaNuova, crescono i premi nel ramo vita", True),
+    ("VitaNuova Assicurazioni", "Vita nuova, la polizza per chi va in pensione", True),
+    ("VitaNuova Assicurazioni", "La Vita Nuova di Dante torna in libreria", False),
+    ("VitaNuova Assicurazioni", "Una vita nuova per la compagnia teatrale", False),
+    ("VitaNuova Assicurazioni", "Vita nuova dopo il trasloco: consigli per l'arredamento", False),
+    ("VitaNuova Assicurazioni", "Nuova vita per il borgo abbandonato", False),
+    ("Unidea Assicurazioni", "Unidea Assicurazioni amplia l'offerta auto", True),
+    ("Unidea Assicurazioni", "Unidea, nuove coperture per le piccole imprese", True),
+    ("Unidea Assicurazioni", "Un'idea per il weekend: le mete più belle", False),
+    ("Alleanza Assicurazioni", "Alleanza Assicurazioni premia i migliori agenti", True),
+    ("Alleanza Assicurazioni", "Alleanza lancia una nuova polizza: nato il prodotto per i giovani", True),
+    ("Alleanza Assicurazioni", "Alleanza, è partito il nuovo piano agenti", True),
+    ("Alleanza Assicurazioni", "Alleanza e la previdenza integrativa per le famiglie", True),
+    ("Alleanza Assicurazioni", "Alleanza Verdi e Sinistra presenta le liste per le elezioni", False),
+    ("Alleanza Assicurazioni", "Vertice NATO, rafforzata l'alleanza atlantica", False),
+    ("Alleanza Assicurazioni", "Il partito democratico cerca un'alleanza con il centro", False),
+    ("Alleanza Assicurazioni", "Nuova alleanza tra scuole e imprese del territorio", False),
+    ("Alleanza Assicurazioni", "Nuova alleanza tra agenti immobiliari e notai", False),
+    ("Alleanza Assicurazioni", "Cresce la rete di agenti: Alleanza assume in tutta Italia", True),
+    ("Alleanza Assicurazioni", "Premiati gli agenti di Alleanza a Milano", True),
+])
+def test_relevance_score(scanner, company, title, relevant):
+    score = scanner.relevance_score({'title': title}, company)
+    assert (score >= scanner.relevance_threshold) == relevant
+
+
+def test_filter_relevant_reuses_cached_verdicts(scanner, monkeypatch):
+    company = 'Unidea Assicurazioni'
+    articles = [
+        {'title': 'Unidea amplia la rete', 'link': 'on'},
+        {'title': "Un'idea per il weekend", 'link': 'off'}
+    ]
+
+    assert [a['link'] for a in scanner._filter_relevant(iter(articles), company)] == ['on']
+    assert scanner.filtered_counts[company] == 1
+
+    def fail(*args):
+        raise AssertionError("verdict should come from the cache")
+    monkeypatch.setattr(scanner, 'relevance_score', fail)
+
+    assert [a['link'] for a in scanner._filter_relevant(iter(articles), company)] == ['on']
+    # The count is per fetch, not accumulated across fetches
+    assert scanner.filtered_counts[company] == 1
+
+    assert list(scanner._filter_relevant(iter(articles[:1]), company)) == articles[:1]
+    assert scanner.filtered_counts[company] == 0